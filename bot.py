@@ -3,9 +3,10 @@ from discord.ext import commands
 import logging
 import asyncio
 from pathlib import Path
+from typing import Dict
 
 import config
-from tts_engine import TTSEngine
+from cancellation import GenerationCancelled
 from voice_manager import VoiceManager
 
 # Setup logging
@@ -20,11 +21,34 @@ intents = discord.Intents.default()
 intents.message_content = True
 intents.voice_states = True
 
-bot = commands.Bot(command_prefix=config.COMMAND_PREFIX, intents=intents)
+if config.SHARD_COUNT:
+    bot = commands.AutoShardedBot(
+        command_prefix=config.COMMAND_PREFIX,
+        intents=intents,
+        shard_count=config.SHARD_COUNT,
+        shard_ids=config.SHARD_IDS or None,
+    )
+else:
+    bot = commands.Bot(command_prefix=config.COMMAND_PREFIX, intents=intents)
 
 # Initialize modules
-tts_engine = TTSEngine()
-voice_manager = VoiceManager(bot)
+if config.TTS_SERVER_URL:
+    # Shared inference server (tts_server.py), model is not loaded in this process
+    from tts_client import TTSClient
+    tts_engine = TTSClient()
+else:
+    from tts_engine import TTSEngine
+    tts_engine = TTSEngine()
+
+# One voice connection per guild
+voice_managers: Dict[int, VoiceManager] = {}
+
+
+def get_voice_manager(guild: discord.Guild) -> VoiceManager:
+    """Get or create the voice manager for a guild"""
+    if guild.id not in voice_managers:
+        voice_managers[guild.id] = VoiceManager(bot, interrupt=config.INTERRUPT_MODE)
+    return voice_managers[guild.id]
 
 
 @bot.event
@@ -55,8 +79,10 @@ async def on_ready():
 
 
 @bot.command(name="stream")
+@commands.guild_only()
 async def stream_command(ctx: commands.Context, *, text: str):
     """Stream TTS with parallel generation and playback"""
+    voice_manager = get_voice_manager(ctx.guild)
     if not voice_manager.is_connected():
         if ctx.author.voice:
             await voice_manager.join_channel(ctx.author.voice.channel)
@@ -66,6 +92,8 @@ async def stream_command(ctx: commands.Context, *, text: str):
     
     await ctx.send(f"🎵 Streaming: {text[:50]}...")
     
+    cancel_token = voice_manager.begin_speech()
+    
     # Queue for chunks
     chunk_queue = asyncio.Queue(maxsize=2)  # Buffer 2 chunks ahead
     generation_done = asyncio.Event()
@@ -73,14 +101,19 @@ async def stream_command(ctx: commands.Context, *, text: str):
     
     # Producer: Generate chunks
     async def generate_chunks():
+        chunks = tts_engine.generate_streaming(text, cancel_token=cancel_token)
         try:
-            async for chunk_path, sr in tts_engine.generate_streaming(text):
+            async for chunk_path, sr in chunks:
+                if cancel_token.cancelled:
+                    chunk_path.unlink(missing_ok=True)
+                    break
                 logger.info(f"Generated chunk: {chunk_path}")
                 await chunk_queue.put(chunk_path)
         except Exception as e:
             logger.error(f"Generation failed: {e}")
             error_container.append(e)
         finally:
+            await chunks.aclose()
             generation_done.set()
             await chunk_queue.put(None)  # Sentinel
     
@@ -91,8 +124,12 @@ async def stream_command(ctx: commands.Context, *, text: str):
                 chunk_path = await chunk_queue.get()
                 if chunk_path is None:  # Sentinel
                     break
+                if cancel_token.cancelled:
+                    # Keep draining so the producer is never blocked on a full queue
+                    chunk_path.unlink(missing_ok=True)
+                    continue
                 logger.info(f"Playing chunk: {chunk_path}")
-                await voice_manager.play_audio(chunk_path, cleanup=True)
+                await voice_manager.play_audio(chunk_path, cleanup=True, cancel_token=cancel_token)
         except Exception as e:
             logger.error(f"Playback failed: {e}")
             error_container.append(e)
@@ -106,18 +143,26 @@ async def stream_command(ctx: commands.Context, *, text: str):
         
         if error_container:
             error_msg = str(error_container[0])[:500]; await ctx.send(f"❌ Error: {error_msg}")
+        elif cancel_token.cancelled:
+            await ctx.send("⏭️ Skipped")
         else:
             await ctx.send("✅ Done!")
     except Exception as e:
         logger.error(f"Stream failed: {e}")
         error_msg = str(e)[:500]; await ctx.send(f"❌ Failed: {error_msg}")
+    finally:
+        voice_manager.end_speech(cancel_token)
+
 @bot.command(name="tts")
+@commands.guild_only()
 async def tts_command(ctx: commands.Context, *, text: str):
     """
     Generate TTS and play in voice channel
     
     Usage: !tts <텍스트>
     """
+    voice_manager = get_voice_manager(ctx.guild)
+    
     # Check if user is in voice channel
     if not ctx.author.voice:
         await ctx.reply("❌ 음성 채널에 먼저 들어가주세요!")
@@ -138,39 +183,58 @@ async def tts_command(ctx: commands.Context, *, text: str):
             await ctx.reply("❌ 음성 채널 이동에 실패했습니다.")
             return
     
-    # Show typing indicator
-    async with ctx.typing():
-        try:
-            # Generate TTS
-            audio_path = await asyncio.get_event_loop().run_in_executor(
-                None,
-                tts_engine.generate,
-                text,
-                config.DEFAULT_VOICE,
-                None
-            )
-            
-            await ctx.reply(f"🔊 생성 완료! 재생합니다...")
-            
-        except Exception as e:
-            logger.error(f"TTS generation failed: {e}")
-            error_msg = str(e)[:300]; await ctx.reply(f"❌ TTS 생성 실패: {error_msg}")
-            return
-    
-    # Play audio
-    success = await voice_manager.play_audio(audio_path, cleanup=True)
-    
-    if not success:
-        await ctx.reply("❌ 오디오 재생에 실패했습니다.")
+    cancel_token = voice_manager.begin_speech()
+    # Reserve a model on the event loop so jobs waiting for the executor count
+    # towards the router's backlog
+    route = tts_engine.reserve(text)
+    try:
+        # Show typing indicator
+        async with ctx.typing():
+            try:
+                # Generate TTS
+                audio_path = await asyncio.get_event_loop().run_in_executor(
+                    None,
+                    tts_engine.generate,
+                    text,
+                    config.DEFAULT_VOICE,
+                    None,
+                    cancel_token,
+                    route
+                )
+                
+                await ctx.reply(f"🔊 생성 완료! 재생합니다...")
+                
+            except GenerationCancelled:
+                await ctx.reply("⏭️ 건너뛰었습니다.")
+                return
+            except Exception as e:
+                logger.error(f"TTS generation failed: {e}")
+                error_msg = str(e)[:300]; await ctx.reply(f"❌ TTS 생성 실패: {error_msg}")
+                return
+        
+        # Play audio
+        success = await voice_manager.play_audio(audio_path, cleanup=True, cancel_token=cancel_token)
+        
+        if cancel_token.cancelled:
+            await ctx.reply("⏭️ 건너뛰었습니다.")
+        elif not success:
+            await ctx.reply("❌ 오디오 재생에 실패했습니다.")
+    finally:
+        # Releases the route if the job never ran
+        tts_engine.release(route)
+        voice_manager.end_speech(cancel_token)
 
 
 @bot.command(name="join")
+@commands.guild_only()
 async def join_command(ctx: commands.Context):
     """
     Join user's voice channel
     
     Usage: !join
     """
+    voice_manager = get_voice_manager(ctx.guild)
+    
     if not ctx.author.voice:
         await ctx.reply("❌ 먼저 음성 채널에 들어가주세요!")
         return
@@ -185,12 +249,15 @@ async def join_command(ctx: commands.Context):
 
 
 @bot.command(name="leave")
+@commands.guild_only()
 async def leave_command(ctx: commands.Context):
     """
     Leave voice channel
     
     Usage: !leave
     """
+    voice_manager = get_voice_manager(ctx.guild)
+    
     if not voice_manager.is_connected():
         await ctx.reply("❌ 음성 채널에 연결되어 있지 않습니다.")
         return
@@ -204,6 +271,61 @@ async def leave_command(ctx: commands.Context):
         await ctx.reply("❌ 채널 나가기에 실패했습니다.")
 
 
+@bot.command(name="skip")
+@commands.guild_only()
+async def skip_command(ctx: commands.Context):
+    """
+    Skip the message currently being spoken (stops its generation too)
+    
+    Usage: !skip
+    """
+    voice_manager = get_voice_manager(ctx.guild)
+    
+    if voice_manager.skip():
+        await ctx.reply("⏭️ 현재 메시지를 건너뛰었습니다.")
+    else:
+        await ctx.reply("❌ 재생 중인 메시지가 없습니다.")
+
+
+@bot.command(name="stop")
+@commands.guild_only()
+async def stop_command(ctx: commands.Context):
+    """
+    Cancel all pending and playing messages
+    
+    Usage: !stop
+    """
+    voice_manager = get_voice_manager(ctx.guild)
+    
+    count = voice_manager.cancel_all()
+    if count:
+        await ctx.reply(f"⏹️ {count}개의 메시지를 취소했습니다.")
+    else:
+        await ctx.reply("❌ 재생 중인 메시지가 없습니다.")
+
+
+@bot.command(name="interrupt")
+@commands.guild_only()
+async def interrupt_command(ctx: commands.Context, mode: str = None):
+    """
+    Toggle "newest message interrupts current speech" mode
+    
+    Usage: !interrupt [on|off]
+    """
+    voice_manager = get_voice_manager(ctx.guild)
+    
+    if mode is None:
+        voice_manager.interrupt = not voice_manager.interrupt
+    elif mode.lower() in ("on", "off"):
+        voice_manager.interrupt = mode.lower() == "on"
+    else:
+        await ctx.reply("❌ 사용법: `!interrupt [on|off]`")
+        return
+    
+    state = "켜짐" if voice_manager.interrupt else "꺼짐"
+    await ctx.reply(f"✅ 끼어들기 모드: **{state}**")
+
+
 @bot.command(name="clone")
 @commands.check(lambda ctx: ctx.author.id in config.ADMIN_IDS)
 async def clone_command(ctx: commands.Context, voice_name: str):
@@ -253,6 +375,32 @@ async def clone_command(ctx: commands.Context, voice_name: str):
             error_msg = str(e)[:300]; await ctx.reply(f"❌ 목소리 프로필 생성 실패: {error_msg}")
 
 
+@bot.command(name="metrics")
+@commands.check(lambda ctx: ctx.author.id in config.ADMIN_IDS)
+async def metrics_command(ctx: commands.Context):
+    """
+    Show model routing metrics (Admin only)
+    
+    Usage: !metrics
+    """
+    try:
+        metrics = await asyncio.get_event_loop().run_in_executor(None, tts_engine.metrics)
+    except Exception as e:
+        logger.error(f"Failed to get metrics: {e}")
+        error_msg = str(e)[:300]; await ctx.reply(f"❌ 메트릭 조회 실패: {error_msg}")
+        return
+    
+    lines = [f"📊 **모델 라우팅** (대기: {metrics['queue_depth']}건, 예상 {metrics['estimated_wait']:.1f}초)"]
+    for size, stats in metrics["models"].items():
+        lines.append(
+            f"• **{size}**: 완료 {stats['completed']} / 대기 {stats['pending']} / "
+            f"{stats['seconds_per_char'] * 1000:.0f}ms/자"
+        )
+    for decision, count in sorted(metrics["decisions"].items()):
+        lines.append(f"`{decision}`: {count}")
+    await ctx.reply("\n".join(lines))
+
+
 @bot.command(name="voices")
 async def voices_command(ctx: commands.Context):
     """
@@ -286,8 +434,11 @@ async def commands_command(ctx: commands.Context):
 `!tts <텍스트>` - TTS 생성
 `!stream <텍스트>` - 스트리밍 TTS
 `!join` / `!leave` - 채널 입/퇴장
+`!skip` / `!stop` - 현재 메시지 건너뛰기 / 전체 취소
+`!interrupt [on|off]` - 새 메시지가 현재 음성을 끊기
 `!voices` - 목소리 목록
 `!clone <이름>` - 목소리 추가 (관리자)
+`!metrics` - 모델 라우팅 통계 (관리자)
 
 🚀 Optimized: 0.6B model + FlashAttention2
 🎙️ Voice: {config.DEFAULT_VOICE}
@@ -302,6 +453,8 @@ async def on_command_error(ctx: commands.Context, error: commands.CommandError):
         return  # Ignore unknown commands
     elif isinstance(error, commands.MissingRequiredArgument):
         await ctx.reply(f"❌ 필수 인자가 누락되었습니다: `{error.param.name}`")
+    elif isinstance(error, commands.NoPrivateMessage):
+        await ctx.reply("❌ 서버 채널에서만 사용할 수 있는 명령어입니다.")
     elif isinstance(error, commands.CheckFailure):
         await ctx.reply("❌ 이 명령어를 실행할 권한이 없습니다. (관리자 전용)")
     else:
@@ -0,0 +1,48 @@
+import threading
+from typing import Callable, List
+
+
+class GenerationCancelled(Exception):
+    """Raised when a TTS request is cancelled before its audio is ready"""
+
+
+class CancellationToken:
+    """Thread-safe cancel flag shared by a command, its playback and TTS generation"""
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks: List[Callable[[], None]] = []
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self):
+        """Request cancellation (safe to call from any thread, more than once)"""
+        with self._lock:
+            if self._event.is_set():
+                return
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            callback()
+
+    def add_callback(self, callback: Callable[[], None]):
+        """Call callback on cancel() (immediately if already cancelled)"""
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return
+        callback()
+
+    def remove_callback(self, callback: Callable[[], None]):
+        """Unregister a callback added with add_callback()"""
+        with self._lock:
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
+
+    def raise_if_cancelled(self):
+        """Raise GenerationCancelled if cancel() was called"""
+        if self._event.is_set():
+            raise GenerationCancelled()
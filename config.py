@@ -16,7 +16,33 @@ VOICES_DIR = Path("voices")
 # Model Configuration
 DEVICE = os.getenv("DEVICE", "cuda:0")
 MODEL_SIZE = os.getenv("MODEL_SIZE", "1.7B")  # "0.6B" or "1.7B"
-MODEL_NAME = f"Qwen/Qwen3-TTS-12Hz-{MODEL_SIZE}-Base"
+MODEL_NAME_TEMPLATE = "Qwen/Qwen3-TTS-12Hz-{size}-Base"
+MODEL_NAME = MODEL_NAME_TEMPLATE.format(size=MODEL_SIZE)
+# Models loaded at once, e.g. "0.6B,1.7B" enables load-adaptive routing (default: MODEL_SIZE only)
+MODEL_SIZES = [size.strip() for size in os.getenv("MODEL_SIZES", MODEL_SIZE).split(",") if size.strip()]
+
+# Model Routing (only used when several MODEL_SIZES are loaded)
+ROUTER_MAX_WAIT = float(os.getenv("ROUTER_MAX_WAIT", 3.0))  # Estimated backlog (s) ahead of a job, use the smaller model above it
+ROUTER_MAX_QUEUE = int(os.getenv("ROUTER_MAX_QUEUE", 4))  # Pending jobs before falling back to the smaller model
+ROUTER_LONG_TEXT = int(os.getenv("ROUTER_LONG_TEXT", 200))  # Texts longer than this (chars) use the smaller model
+ROUTER_FAST_FIRST_CHUNK = os.getenv("ROUTER_FAST_FIRST_CHUNK", "true").lower() == "true"  # First stream chunk on the smaller model
+
+# Stub model (no GPU / weights, for local testing)
+USE_STUB_MODEL = os.getenv("USE_STUB_MODEL", "false").lower() == "true"
+STUB_SECONDS_PER_CHAR = float(os.getenv("STUB_SECONDS_PER_CHAR", "0.08"))  # Audio length per character
+STUB_REALTIME_FACTOR = float(os.getenv("STUB_REALTIME_FACTOR", "0.3"))  # Generation time / audio length (largest model)
+
+# TTS Inference Server
+TTS_SERVER_URL = os.getenv("TTS_SERVER_URL", "")  # e.g. http://127.0.0.1:8765 (empty = load model in-process)
+TTS_SERVER_HOST = os.getenv("TTS_SERVER_HOST", "127.0.0.1")
+TTS_SERVER_PORT = int(os.getenv("TTS_SERVER_PORT", 8765))
+TTS_SERVER_WORKERS = int(os.getenv("TTS_SERVER_WORKERS", 1))  # Concurrent model calls on the server
+TTS_CLIENT_POOL_SIZE = int(os.getenv("TTS_CLIENT_POOL_SIZE", 4))  # Idle keep-alive connections per bot process
+TTS_CLIENT_TIMEOUT = float(os.getenv("TTS_CLIENT_TIMEOUT", 120))
+
+# Sharding
+SHARD_COUNT = int(os.getenv("SHARD_COUNT", 0))  # 0 = single unsharded bot
+SHARD_IDS = [int(id.strip()) for id in os.getenv("SHARD_IDS", "").split(",") if id.strip()]
 
 # Admin Configuration
 ADMIN_IDS = [int(id.strip()) for id in os.getenv("ADMIN_IDS", "").split(",") if id.strip()]
@@ -24,8 +50,12 @@ ADMIN_IDS = [int(id.strip()) for id in os.getenv("ADMIN_IDS", "").split(",") if
 # Audio Configuration
 SAMPLE_RATE = 12000
 AUDIO_FORMAT = "wav"
+SENTENCE_PAUSE = float(os.getenv("SENTENCE_PAUSE", 0.3))  # Silence (s) between sentences in !tts audio
 TEMP_DIR = Path("temp")
 TEMP_DIR.mkdir(exist_ok=True)
 
+# Playback Configuration
+INTERRUPT_MODE = os.getenv("INTERRUPT_MODE", "false").lower() == "true"  # Newest message interrupts current speech
+
 # Command Prefix
 COMMAND_PREFIX = "!"
@@ -0,0 +1,522 @@
+"""
+Load-test harness for bot.py
+
+Runs the real command handlers against in-process fake Discord objects
+(context, guilds, voice channels and a VoiceClient that consumes audio in
+real time) with the stub TTS model, then reports latency percentiles,
+queue growth, dropped requests and memory over time.
+
+Usage:
+    python load_test.py --rate 2 --duration 60 --guilds 5
+    python load_test.py --trace trace.jsonl --speed 2.0
+    python load_test.py --rate 2 --duration 60 --save-trace trace.jsonl
+
+Trace format (JSONL, one request per line):
+    {"t": 0.5, "guild": 1, "user": 10, "command": "tts", "text": "..."}
+"""
+import os
+
+# Must be set before config is imported
+os.environ.setdefault("USE_STUB_MODEL", "true")
+
+import argparse
+import asyncio
+import contextvars
+import json
+import logging
+import math
+import random
+import shutil
+import tempfile
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import discord
+import numpy as np
+import soundfile as sf
+
+import config
+
+logger = logging.getLogger(__name__)
+
+# Request currently being handled (propagates into tasks spawned by handlers)
+current_request: contextvars.ContextVar[Optional["RequestRecord"]] = contextvars.ContextVar(
+    "current_request", default=None
+)
+
+SAMPLE_TEXTS = [
+    "안녕하세요.",
+    "오늘 날씨가 정말 좋네요!",
+    "잠깐만 기다려 주세요. 금방 돌아올게요.",
+    "이번 판은 진짜 이길 수 있을 것 같아요. 다들 집중해 주세요! 오른쪽으로 갑니다.",
+    "회의 시작하겠습니다. 첫 번째 안건은 다음 주 일정입니다. 두 번째 안건은 서버 비용입니다. "
+    "마지막으로 질문 있으신 분은 말씀해 주세요.",
+]
+
+
+# ---------------------------------------------------------------------------
+# Fake Discord objects
+# ---------------------------------------------------------------------------
+
+class WavPCMAudio(discord.AudioSource):
+    """FFmpegPCMAudio replacement used when ffmpeg is not installed"""
+
+    FRAME_SIZE = 3840  # 20ms of 48kHz 16-bit stereo, same as discord.py
+
+    def __init__(self, source: str, **kwargs):
+        wav, sr = sf.read(source, dtype="float32", always_2d=True)
+        mono = wav.mean(axis=1)
+        n_out = int(len(mono) * 48000 / sr)
+        resampled = np.interp(np.linspace(0, len(mono), n_out, endpoint=False), np.arange(len(mono)), mono)
+        pcm = (np.clip(resampled, -1.0, 1.0) * 32767).astype("<i2")
+        self._data = np.repeat(pcm, 2).tobytes()
+        self._pos = 0
+
+    def read(self) -> bytes:
+        frame = self._data[self._pos:self._pos + self.FRAME_SIZE]
+        self._pos += self.FRAME_SIZE
+        if len(frame) < self.FRAME_SIZE:
+            return b""
+        return frame
+
+
+class FakeVoiceClient:
+    """VoiceClient stand-in that reads the audio source in real time (20ms frames)"""
+
+    def __init__(self, channel: "FakeVoiceChannel"):
+        self.channel = channel
+        self._connected = True
+        self._player: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def is_connected(self) -> bool:
+        return self._connected
+
+    def is_playing(self) -> bool:
+        return self._player is not None and self._player.is_alive()
+
+    async def move_to(self, channel: "FakeVoiceChannel"):
+        self.channel = channel
+
+    async def disconnect(self, *, force: bool = False):
+        self.stop()
+        self._connected = False
+
+    def play(self, source: discord.AudioSource, *, after=None):
+        if self.is_playing():
+            raise discord.ClientException("Already playing audio.")
+
+        record = current_request.get()
+        if record is not None and record.first_audio is None:
+            record.first_audio = time.perf_counter()
+
+        self._stop.clear()
+        self._player = threading.Thread(target=self._run, args=(source, after), daemon=True)
+        self._player.start()
+
+    def _run(self, source: discord.AudioSource, after):
+        error = None
+        try:
+            start = time.perf_counter()
+            frames = 0
+            while not self._stop.is_set():
+                if not source.read():
+                    break
+                frames += 1
+                delay = start + frames * 0.02 - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+        except Exception as e:
+            error = e
+        finally:
+            source.cleanup()
+            if after is not None:
+                after(error)
+
+    def stop(self):
+        self._stop.set()
+
+
+@dataclass
+class FakeGuild:
+    id: int
+    name: str
+
+
+@dataclass
+class FakeVoiceChannel:
+    id: int
+    name: str
+    guild: FakeGuild
+    connect_delay: float = 0.0
+
+    async def connect(self, **kwargs) -> FakeVoiceClient:
+        await asyncio.sleep(self.connect_delay)
+        return FakeVoiceClient(self)
+
+
+@dataclass
+class FakeVoiceState:
+    channel: FakeVoiceChannel
+
+
+@dataclass
+class FakeMember:
+    id: int
+    name: str
+    voice: Optional[FakeVoiceState]
+
+
+@dataclass
+class FakeMessage:
+    content: str
+    attachments: List[Any] = field(default_factory=list)
+
+
+class _Typing:
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class FakeContext:
+    """Minimal commands.Context used by the bot.py command handlers"""
+
+    def __init__(self, guild: FakeGuild, author: FakeMember, content: str, record: "RequestRecord"):
+        self.guild = guild
+        self.author = author
+        self.message = FakeMessage(content)
+        self.record = record
+
+    async def send(self, content: str = None, **kwargs):
+        self.record.replies.append(content)
+        if content and content.startswith("❌"):
+            self.record.error = content
+        elif content and content.startswith("⏭️"):
+            self.record.skipped = True
+
+    reply = send
+
+    def typing(self) -> _Typing:
+        return _Typing()
+
+
+# ---------------------------------------------------------------------------
+# Trace and metrics
+# ---------------------------------------------------------------------------
+
+@dataclass
+class TraceEntry:
+    t: float
+    guild: int
+    user: int
+    command: str
+    text: str
+
+
+@dataclass
+class RequestRecord:
+    entry: TraceEntry
+    started: float = 0.0
+    first_audio: Optional[float] = None
+    finished: Optional[float] = None
+    error: Optional[str] = None
+    skipped: bool = False
+    replies: List[str] = field(default_factory=list)
+
+
+def synthetic_trace(rate: float, duration: float, guilds: int, users_per_guild: int,
+                    stream_ratio: float, seed: int) -> List[TraceEntry]:
+    """Poisson arrivals spread uniformly over guilds"""
+    rng = random.Random(seed)
+    trace = []
+    t = rng.expovariate(rate)
+    while t < duration:
+        guild = rng.randrange(guilds)
+        trace.append(TraceEntry(
+            t=round(t, 3),
+            guild=guild,
+            user=guild * users_per_guild + rng.randrange(users_per_guild),
+            command="stream" if rng.random() < stream_ratio else "tts",
+            text=rng.choice(SAMPLE_TEXTS),
+        ))
+        t += rng.expovariate(rate)
+    return trace
+
+
+def load_trace(path: Path) -> List[TraceEntry]:
+    """Load a recorded JSONL trace"""
+    trace = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                trace.append(TraceEntry(**json.loads(line)))
+    return sorted(trace, key=lambda e: e.t)
+
+
+def save_trace(trace: List[TraceEntry], path: Path):
+    """Write a trace as JSONL"""
+    with open(path, "w", encoding="utf-8") as f:
+        for entry in trace:
+            f.write(json.dumps(entry.__dict__, ensure_ascii=False) + "\n")
+
+
+def percentiles(values: List[float]) -> Dict[str, float]:
+    """p50/p90/p99/max in seconds"""
+    if not values:
+        return {}
+    values = sorted(values)
+
+    def pct(p: float) -> float:
+        return values[min(len(values) - 1, math.ceil(p / 100 * len(values)) - 1)]
+
+    return {"p50": pct(50), "p90": pct(90), "p99": pct(99), "max": values[-1]}
+
+
+# ---------------------------------------------------------------------------
+# Runner
+# ---------------------------------------------------------------------------
+
+class LoadTest:
+    """Replays a trace against bot.py's command handlers"""
+
+    def __init__(self, trace: List[TraceEntry], speed: float, workers: int,
+                 timeout: float, sample_interval: float, connect_delay: float):
+        self.trace = trace
+        self.speed = speed
+        self.timeout = timeout
+        self.sample_interval = sample_interval
+        self.connect_delay = connect_delay
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="tts")
+        self.records: List[RequestRecord] = []
+        self.in_flight: Dict[int, int] = {}
+        self.samples: List[Dict[str, float]] = []
+        self._guilds: Dict[int, FakeGuild] = {}
+        self._channels: Dict[int, FakeVoiceChannel] = {}
+
+    def _context(self, entry: TraceEntry, record: RequestRecord) -> FakeContext:
+        guild_id = 1000 + entry.guild
+        if guild_id not in self._guilds:
+            guild = FakeGuild(guild_id, f"guild-{entry.guild}")
+            self._guilds[guild_id] = guild
+            self._channels[guild_id] = FakeVoiceChannel(
+                guild_id * 10, f"voice-{entry.guild}", guild, self.connect_delay
+            )
+        channel = self._channels[guild_id]
+        author = FakeMember(entry.user, f"user-{entry.user}", FakeVoiceState(channel))
+        return FakeContext(self._guilds[guild_id], author, f"{config.COMMAND_PREFIX}{entry.command} {entry.text}", record)
+
+    async def _handle(self, bot_module, entry: TraceEntry):
+        record = RequestRecord(entry)
+        self.records.append(record)
+        current_request.set(record)
+        ctx = self._context(entry, record)
+        command = {"tts": bot_module.tts_command, "stream": bot_module.stream_command}[entry.command]
+
+        self.in_flight[ctx.guild.id] = self.in_flight.get(ctx.guild.id, 0) + 1
+        record.started = time.perf_counter()
+        try:
+            await asyncio.wait_for(command.callback(ctx, text=entry.text), self.timeout)
+        except asyncio.TimeoutError:
+            record.error = "timeout"
+        except Exception as e:
+            record.error = f"{type(e).__name__}: {e}"
+        finally:
+            record.finished = time.perf_counter()
+            self.in_flight[ctx.guild.id] -= 1
+
+    async def _sample(self, t0: float, engine):
+        loop = asyncio.get_running_loop()
+        while True:
+            # Jobs queued or running on the model (in-process engine or remote server)
+            try:
+                if config.TTS_SERVER_URL:
+                    metrics = await loop.run_in_executor(None, engine.metrics)
+                else:
+                    metrics = engine.metrics()  # Cheap; don't queue behind model jobs
+                model_queue = metrics["queue_depth"]
+            except Exception as e:
+                logger.warning(f"Failed to sample model queue: {e}")
+                model_queue = 0
+            current, _ = tracemalloc.get_traced_memory()
+            self.samples.append({
+                "t": time.perf_counter() - t0,
+                "in_flight": sum(self.in_flight.values()),
+                "max_guild_in_flight": max(self.in_flight.values(), default=0),
+                "model_queue": model_queue,
+                "memory_mb": current / 1024 / 1024,
+            })
+            await asyncio.sleep(self.sample_interval)
+
+    async def run(self) -> Dict[str, Any]:
+        loop = asyncio.get_running_loop()
+        if not config.TTS_SERVER_URL:
+            # In-process model: limit concurrent model calls like a single GPU
+            loop.set_default_executor(self.executor)
+
+        import bot as bot_module
+
+        async with bot_module.bot:
+            await loop.run_in_executor(None, bot_module.tts_engine.load_model)
+
+            tracemalloc.start()
+            t0 = time.perf_counter()
+            sampler = asyncio.create_task(self._sample(t0, bot_module.tts_engine))
+            tasks = []
+            for entry in self.trace:
+                delay = t0 + entry.t / self.speed - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                tasks.append(asyncio.create_task(self._handle(bot_module, entry)))
+
+            await asyncio.gather(*tasks)
+            sampler.cancel()
+            elapsed = time.perf_counter() - t0
+            tracemalloc.stop()
+            routing = await loop.run_in_executor(None, bot_module.tts_engine.metrics)
+
+            for voice_manager in bot_module.voice_managers.values():
+                await voice_manager.leave_channel()
+
+        self.executor.shutdown(wait=False)
+        return self.report(elapsed, routing)
+
+    def report(self, elapsed: float, routing: Dict[str, Any]) -> Dict[str, Any]:
+        completed = [r for r in self.records if r.error is None and not r.skipped]
+        skipped = [r for r in self.records if r.error is None and r.skipped]
+        dropped = [r for r in self.records if r.error is not None]
+        by_command = {}
+        for command in sorted({r.entry.command for r in self.records}):
+            done = [r for r in completed if r.entry.command == command]
+            by_command[command] = {
+                "requests": sum(1 for r in self.records if r.entry.command == command),
+                "first_audio": percentiles([r.first_audio - r.started for r in done if r.first_audio]),
+                "total": percentiles([r.finished - r.started for r in done]),
+            }
+
+        return {
+            "elapsed": elapsed,
+            "requests": len(self.records),
+            "completed": len(completed),
+            "skipped": len(skipped),
+            "dropped": len(dropped),
+            "drop_reasons": sorted({r.error[:80] for r in dropped}),
+            "latency": by_command,
+            "peak_in_flight": max((s["in_flight"] for s in self.samples), default=0),
+            "peak_model_queue": max((s["model_queue"] for s in self.samples), default=0),
+            "peak_memory_mb": max((s["memory_mb"] for s in self.samples), default=0.0),
+            "routing": routing,
+            "samples": self.samples,
+        }
+
+
+def print_report(report: Dict[str, Any], timeline_rows: int = 20):
+    """Print a human-readable summary"""
+    print(f"\n=== Load test: {report['requests']} requests in {report['elapsed']:.1f}s ===")
+    print(f"completed: {report['completed']}  skipped: {report['skipped']}  dropped: {report['dropped']}")
+    for reason in report["drop_reasons"]:
+        print(f"  - {reason}")
+
+    print("\nlatency (s)          p50     p90     p99     max")
+    for command, stats in report["latency"].items():
+        for name in ("first_audio", "total"):
+            p = stats[name]
+            if p:
+                print(f"{command:>6} {name:<12} {p['p50']:7.2f} {p['p90']:7.2f} {p['p99']:7.2f} {p['max']:7.2f}")
+
+    print(f"\npeak in-flight: {report['peak_in_flight']}  "
+          f"peak model queue: {report['peak_model_queue']}  "
+          f"peak memory: {report['peak_memory_mb']:.1f} MB")
+
+    routing = report["routing"]
+    if len(routing["models"]) > 1:
+        print("\nmodel routing")
+        for size, stats in routing["models"].items():
+            print(f"  {size}: {stats['completed']} jobs, {stats['seconds_per_char'] * 1000:.0f} ms/char")
+        for decision, count in sorted(routing["decisions"].items()):
+            print(f"  {decision:<24} {count}")
+
+    samples = report["samples"]
+    if samples:
+        print("\n     t  in_flight  guild_max  model_queue  mem_MB")
+        step = max(1, len(samples) // timeline_rows)
+        for s in samples[::step]:
+            print(f"{s['t']:6.1f}  {s['in_flight']:9d}  {s['max_guild_in_flight']:9d}  "
+                  f"{s['model_queue']:11d}  {s['memory_mb']:6.1f}")
+
+
+def _prepare_voice():
+    """Use a temporary voice profile if the default voice has no reference audio"""
+    if (config.VOICES_DIR / config.DEFAULT_VOICE / "reference.wav").exists():
+        return
+    voices_dir = Path(tempfile.mkdtemp(prefix="tts_load_test_"))
+    voice_dir = voices_dir / config.DEFAULT_VOICE
+    voice_dir.mkdir()
+    sf.write(str(voice_dir / "reference.wav"), np.zeros(config.SAMPLE_RATE, dtype=np.float32), config.SAMPLE_RATE)
+    (voice_dir / "reference.txt").write_text("테스트", encoding="utf-8")
+    config.VOICES_DIR = voices_dir
+    logger.info(f"Using temporary voice profile in {voices_dir}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test bot.py with fake Discord objects and a stub model")
+    parser.add_argument("--trace", type=Path, help="Replay a recorded JSONL trace")
+    parser.add_argument("--speed", type=float, default=1.0, help="Trace replay speed multiplier")
+    parser.add_argument("--rate", type=float, default=1.0, help="Synthetic requests per second")
+    parser.add_argument("--duration", type=float, default=30.0, help="Synthetic trace length (s)")
+    parser.add_argument("--guilds", type=int, default=3)
+    parser.add_argument("--users-per-guild", type=int, default=5)
+    parser.add_argument("--stream-ratio", type=float, default=0.3, help="Fraction of !stream requests")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--save-trace", type=Path, help="Write the trace used to this file")
+    parser.add_argument("--workers", type=int, default=1, help="Model executor threads, in-process only (1 = one GPU)")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Drop requests slower than this (s)")
+    parser.add_argument("--connect-delay", type=float, default=0.1, help="Simulated voice connect time (s)")
+    parser.add_argument("--model-sizes", help='Models to load, e.g. "0.6B,1.7B" (default: MODEL_SIZES)')
+    parser.add_argument("--interrupt", action="store_true", help="Newest message interrupts current speech")
+    parser.add_argument("--sample-interval", type=float, default=1.0)
+    parser.add_argument("--json", type=Path, help="Write the full report as JSON")
+    parser.add_argument("--verbose", action="store_true", help="Show bot logs")
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO if args.verbose else logging.WARNING,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+    if shutil.which("ffmpeg") is None:
+        logger.warning("ffmpeg not found, decoding WAV chunks in-process instead")
+        discord.FFmpegPCMAudio = WavPCMAudio
+
+    _prepare_voice()
+    if args.interrupt:
+        config.INTERRUPT_MODE = True
+    if args.model_sizes:
+        config.MODEL_SIZES = [size.strip() for size in args.model_sizes.split(",") if size.strip()]
+
+    if args.trace:
+        trace = load_trace(args.trace)
+    else:
+        trace = synthetic_trace(args.rate, args.duration, args.guilds, args.users_per_guild,
+                                args.stream_ratio, args.seed)
+    if args.save_trace:
+        save_trace(trace, args.save_trace)
+
+    test = LoadTest(trace, args.speed, args.workers, args.timeout,
+                    args.sample_interval, args.connect_delay)
+    report = asyncio.run(test.run())
+    print_report(report)
+
+    if args.json:
+        args.json.write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
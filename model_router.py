@@ -0,0 +1,160 @@
+import time
+import threading
+import logging
+from collections import Counter, deque
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+import config
+
+logger = logging.getLogger(__name__)
+
+# Generation speed assumed before the first measurement of a model
+DEFAULT_SECONDS_PER_CHAR = 0.1
+# Weight of the newest measurement in the moving average
+EWMA_ALPHA = 0.3
+
+
+def size_value(model_size: str) -> float:
+    """Parameter count in billions ("0.6B" -> 0.6)"""
+    return float(model_size.rstrip("Bb"))
+
+
+@dataclass(eq=False)
+class RouteDecision:
+    """Model chosen for one generation job"""
+    model_size: str
+    reason: str
+    request_type: str
+    chars: int
+    estimated_wait: float
+    created: float = field(default_factory=time.monotonic)
+
+
+class ModelRouter:
+    """
+    Load-adaptive model selection
+
+    Uses the largest model by default and falls back to the smallest one when
+    the number of pending jobs, the estimated wait for work already queued or
+    the text length would break the latency SLO, and (optionally) for the
+    first chunk of a stream.
+    """
+
+    def __init__(
+        self,
+        model_sizes: List[str],
+        max_wait: float = config.ROUTER_MAX_WAIT,
+        max_queue: int = config.ROUTER_MAX_QUEUE,
+        long_text: int = config.ROUTER_LONG_TEXT,
+        fast_first_chunk: bool = config.ROUTER_FAST_FIRST_CHUNK,
+    ):
+        self.model_sizes = sorted(model_sizes, key=size_value)
+        self.fast = self.model_sizes[0]
+        self.quality = self.model_sizes[-1]
+        self.max_wait = max_wait
+        self.max_queue = max_queue
+        self.long_text = long_text
+        self.fast_first_chunk = fast_first_chunk
+
+        self._lock = threading.Lock()
+        self._pending: List[RouteDecision] = []  # Routed jobs not finished yet
+        self._seconds_per_char = {size: DEFAULT_SECONDS_PER_CHAR for size in self.model_sizes}
+        self._decisions: Counter = Counter()
+        self._completed: Counter = Counter()
+        self._recent: deque = deque(maxlen=50)
+
+    def _backlog(self) -> float:
+        """Estimated seconds of generation still queued or running (lock held)"""
+        return sum(d.chars * self._seconds_per_char[d.model_size] for d in self._pending)
+
+    def route(self, text: str, request_type: str = "tts") -> RouteDecision:
+        """
+        Pick a model and register the job as pending
+
+        Args:
+            text: Text of this generation job
+            request_type: "tts" (whole message), "first_chunk" or "chunk" (stream)
+
+        Returns:
+            RouteDecision, pass it to finish() when the job is done
+        """
+        chars = len(text)
+        with self._lock:
+            # Only work queued ahead of this job; its own length is covered by long_text
+            wait = self._backlog()
+
+            if len(self.model_sizes) == 1:
+                model_size, reason = self.quality, "single_model"
+            elif request_type == "first_chunk" and self.fast_first_chunk:
+                model_size, reason = self.fast, "first_chunk"
+            elif len(self._pending) >= self.max_queue:
+                model_size, reason = self.fast, "queue_depth"
+            elif wait > self.max_wait:
+                model_size, reason = self.fast, "estimated_wait"
+            elif chars > self.long_text:
+                model_size, reason = self.fast, "long_text"
+            else:
+                model_size, reason = self.quality, "default"
+
+            decision = RouteDecision(model_size, reason, request_type, chars, wait)
+            self._pending.append(decision)
+            self._decisions[f"{model_size}:{reason}"] += 1
+            self._recent.append({
+                "time": time.time(),
+                "request_type": request_type,
+                "chars": chars,
+                "queue_depth": len(self._pending) - 1,
+                "estimated_wait": round(wait, 3),
+                "model_size": model_size,
+                "reason": reason,
+            })
+
+        if reason != "single_model":
+            logger.info(
+                f"Routed {request_type} ({chars} chars, est. wait {wait:.2f}s) -> {model_size} ({reason})"
+            )
+        return decision
+
+    def finish(self, decision: RouteDecision, elapsed: Optional[float] = None):
+        """
+        Mark a job done
+
+        Args:
+            decision: Value returned by route()
+            elapsed: Model compute time in seconds (None if the job did not run)
+        """
+        with self._lock:
+            if decision in self._pending:
+                self._pending.remove(decision)
+            if elapsed is not None and decision.chars:
+                observed = elapsed / decision.chars
+                previous = self._seconds_per_char[decision.model_size]
+                self._seconds_per_char[decision.model_size] = (
+                    EWMA_ALPHA * observed + (1 - EWMA_ALPHA) * previous
+                )
+                self._completed[decision.model_size] += 1
+
+    def metrics(self) -> Dict[str, Any]:
+        """Routing counters and current load, for tuning the thresholds"""
+        with self._lock:
+            return {
+                "thresholds": {
+                    "max_wait": self.max_wait,
+                    "max_queue": self.max_queue,
+                    "long_text": self.long_text,
+                    "fast_first_chunk": self.fast_first_chunk,
+                },
+                "queue_depth": len(self._pending),
+                "estimated_wait": round(self._backlog(), 3),
+                "models": {
+                    size: {
+                        "pending": sum(1 for d in self._pending if d.model_size == size),
+                        "completed": self._completed[size],
+                        "seconds_per_char": round(self._seconds_per_char[size], 4),
+                    }
+                    for size in self.model_sizes
+                },
+                "decisions": dict(self._decisions),
+                "recent": list(self._recent),
+            }
@@ -0,0 +1,44 @@
+import time
+import logging
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+import config
+
+logger = logging.getLogger(__name__)
+
+
+class StubTTSModel:
+    """Drop-in stand-in for Qwen3TTSModel that needs no GPU or weights"""
+
+    def __init__(
+        self,
+        sample_rate: int = config.SAMPLE_RATE,
+        seconds_per_char: float = config.STUB_SECONDS_PER_CHAR,
+        realtime_factor: float = config.STUB_REALTIME_FACTOR,
+    ):
+        self.sample_rate = sample_rate
+        self.seconds_per_char = seconds_per_char
+        self.realtime_factor = realtime_factor
+        logger.info(
+            f"Using stub TTS model ({seconds_per_char}s/char, realtime factor {realtime_factor})"
+        )
+
+    def create_voice_clone_prompt(self, ref_audio: str, ref_text: str, x_vector_only_mode: bool = False) -> Dict[str, Any]:
+        """Return a fake voice prompt (reference audio is not read)"""
+        return {"ref_audio": ref_audio, "ref_text": ref_text}
+
+    def generate_voice_clone(self, text: str, language: str, voice_clone_prompt: Any) -> Tuple[List[np.ndarray], int]:
+        """
+        Simulate voice cloning
+
+        Blocks for (audio length * realtime_factor) seconds and returns a quiet
+        sine tone whose length grows with the text, like the real model.
+        """
+        duration = max(0.2, len(text) * self.seconds_per_char)
+        time.sleep(duration * self.realtime_factor)
+
+        t = np.arange(int(duration * self.sample_rate)) / self.sample_rate
+        wav = (0.1 * np.sin(2 * np.pi * 220 * t)).astype(np.float32)
+        return [wav], self.sample_rate
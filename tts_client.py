@@ -0,0 +1,321 @@
+import asyncio
+import http.client
+import json
+import logging
+import queue
+import socket
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import urlparse
+
+import config
+from cancellation import CancellationToken, GenerationCancelled
+from tts_protocol import FRAME_END, FRAME_ERROR, read_frame
+
+logger = logging.getLogger(__name__)
+
+
+class TTSClient:
+    """Drop-in replacement for TTSEngine that calls a shared tts_server.py"""
+
+    def __init__(self, base_url: str = None, pool_size: int = None, timeout: float = None):
+        self.base_url = (base_url or config.TTS_SERVER_URL).rstrip("/")
+        url = urlparse(self.base_url)
+        self.host = url.hostname
+        self.port = url.port or 80
+        self.model_name = f"remote:{self.base_url}"
+        self.timeout = timeout or config.TTS_CLIENT_TIMEOUT
+
+        # Keeps up to pool_size idle keep-alive connections; requests never wait
+        # for one, so the backlog queues on the server where the router sees it
+        pool_size = pool_size or config.TTS_CLIENT_POOL_SIZE
+        self._idle: "queue.LifoQueue[http.client.HTTPConnection]" = queue.LifoQueue(maxsize=pool_size)
+
+    def _new_connection(self) -> http.client.HTTPConnection:
+        return http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+
+    def _open(self, method: str, path: str, payload: Dict[str, Any] = None,
+              cancel_token: Optional[CancellationToken] = None) -> Tuple[http.client.HTTPConnection, http.client.HTTPResponse]:
+        """
+        Send a request on a pooled connection; the caller must _release() it
+
+        Cancelling cancel_token while waiting for the response closes the socket
+        (the server then stops generating) and raises GenerationCancelled.
+        """
+        body = json.dumps(payload).encode("utf-8") if payload is not None else None
+        headers = {"Content-Type": "application/json"} if body is not None else {}
+
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            conn = self._new_connection()
+
+        current = [conn]
+
+        def abort():
+            self._abort(current[0])
+
+        if cancel_token is not None:
+            cancel_token.add_callback(abort)
+        try:
+            for attempt in range(2):
+                try:
+                    conn.request(method, path, body=body, headers=headers)
+                    if cancel_token is not None:
+                        cancel_token.raise_if_cancelled()
+                    return conn, conn.getresponse()
+                except (ConnectionError, http.client.BadStatusLine):
+                    # Pooled keep-alive connection went stale; retry once on a fresh socket
+                    conn.close()
+                    if attempt or (cancel_token is not None and cancel_token.cancelled):
+                        raise
+                    conn = current[0] = self._new_connection()
+        except Exception as e:
+            conn.close()
+            if cancel_token is not None and cancel_token.cancelled:
+                raise GenerationCancelled() from e
+            raise
+        finally:
+            if cancel_token is not None:
+                cancel_token.remove_callback(abort)
+
+    def _release(self, conn: http.client.HTTPConnection, reuse: bool):
+        """Return a connection to the pool (or close it)"""
+        if reuse:
+            try:
+                self._idle.put_nowait(conn)
+            except queue.Full:
+                conn.close()
+        else:
+            conn.close()
+
+    def _request(self, method: str, path: str, payload: Dict[str, Any] = None,
+                 cancel_token: Optional[CancellationToken] = None) -> Tuple[int, bytes]:
+        """Send a request and read the whole response body"""
+        conn, response = self._open(method, path, payload, cancel_token)
+
+        def abort():
+            self._abort(conn)
+
+        if cancel_token is not None:
+            cancel_token.add_callback(abort)
+        try:
+            data = response.read()
+        except Exception as e:
+            self._release(conn, reuse=False)
+            if cancel_token is not None and cancel_token.cancelled:
+                raise GenerationCancelled() from e
+            raise
+        finally:
+            if cancel_token is not None:
+                cancel_token.remove_callback(abort)
+        self._release(conn, reuse=not response.will_close)
+        return response.status, data
+
+    def _raise_for_status(self, status: int, data: bytes):
+        """Map server errors back to the exceptions TTSEngine would raise"""
+        if status == 200:
+            return
+        message = data.decode("utf-8", errors="replace")
+        if status == 404:
+            raise FileNotFoundError(message)
+        raise RuntimeError(f"TTS server error {status}: {message}")
+
+    def health(self) -> Dict[str, Any]:
+        """Get server status"""
+        status, data = self._request("GET", "/health")
+        self._raise_for_status(status, data)
+        return json.loads(data)
+
+    def metrics(self) -> Dict[str, Any]:
+        """Get model routing metrics from the server"""
+        status, data = self._request("GET", "/metrics")
+        self._raise_for_status(status, data)
+        return json.loads(data)
+
+    def load_model(self):
+        """Wait until the inference server is reachable (the model loads server-side)"""
+        deadline = time.monotonic() + self.timeout
+        while True:
+            try:
+                status = self.health()
+                logger.info(f"Connected to TTS server {self.base_url} (model: {status.get('model')})")
+                return
+            except OSError as e:
+                if time.monotonic() > deadline:
+                    raise RuntimeError(f"TTS server not reachable at {self.base_url}: {e}")
+                logger.info(f"Waiting for TTS server {self.base_url}...")
+                time.sleep(1)
+
+    def reserve(self, text: str) -> None:
+        """No-op, the server routes its own requests when they arrive"""
+        return None
+
+    def release(self, route: Any):
+        """No-op, see reserve()"""
+
+    def generate(self, text: str, voice_name: str = None, output_path: Path = None,
+                 cancel_token: Optional[CancellationToken] = None, route: Any = None) -> Path:
+        """
+        Generate speech on the server
+
+        Args:
+            text: Text to synthesize
+            voice_name: Voice profile name (default: config.DEFAULT_VOICE)
+            output_path: Output file path (default: temp/output_{timestamp}.wav)
+            cancel_token: Abort the request (closing the connection stops the server) if cancelled
+            route: Unused, see reserve()
+
+        Returns:
+            Path to generated audio file
+
+        Raises:
+            GenerationCancelled: If cancel_token was cancelled
+        """
+        voice_name = voice_name or config.DEFAULT_VOICE
+
+        if cancel_token is not None:
+            cancel_token.raise_if_cancelled()
+
+        if output_path is None:
+            timestamp = int(time.time() * 1000)
+            output_path = config.TEMP_DIR / f"output_{timestamp}_{uuid.uuid4().hex[:8]}.{config.AUDIO_FORMAT}"
+
+        logger.info(f"Requesting TTS: '{text[:50]}...' using voice '{voice_name}'")
+
+        status, data = self._request("POST", "/generate", {"text": text, "voice": voice_name}, cancel_token)
+        self._raise_for_status(status, data)
+
+        if cancel_token is not None:
+            cancel_token.raise_if_cancelled()
+
+        output_path.write_bytes(data)
+        return output_path
+
+    def _abort(self, conn: http.client.HTTPConnection):
+        """Shut down a connection's socket from another thread (unblocks a pending read)"""
+        sock = conn.sock
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def _read_stream(self, conn: http.client.HTTPConnection, response: http.client.HTTPResponse,
+                     loop: asyncio.AbstractEventLoop, chunks: asyncio.Queue, stop: threading.Event):
+        """
+        Read /stream frames off the socket as they arrive (runs in a worker thread)
+
+        Chunks are buffered into the queue so the connection goes back to the
+        pool when the server finishes, not when playback catches up.
+        Puts (chunk_path, sample_rate) items, then None or an exception.
+        """
+        finished = False
+        try:
+            if response.status != 200:
+                data = response.read()
+                finished = True
+                self._raise_for_status(response.status, data)
+
+            i = 0
+            while not stop.is_set():
+                kind, sr, payload = read_frame(response)
+                if kind == FRAME_END:
+                    # Drain the chunked terminator so the connection can be reused
+                    response.read()
+                    finished = True
+                    break
+                if kind == FRAME_ERROR:
+                    raise RuntimeError(payload.decode("utf-8", errors="replace"))
+                if stop.is_set():
+                    break
+
+                chunk_path = config.TEMP_DIR / f"chunk_{i}_{int(time.time()*1000)}_{uuid.uuid4().hex[:8]}.wav"
+                chunk_path.write_bytes(payload)
+                i += 1
+                loop.call_soon_threadsafe(chunks.put_nowait, (chunk_path, sr))
+
+            loop.call_soon_threadsafe(chunks.put_nowait, None)
+        except Exception as e:
+            loop.call_soon_threadsafe(chunks.put_nowait, e)
+        finally:
+            self._release(conn, reuse=finished and not response.will_close)
+
+    async def generate_streaming(self, text: str, voice_name: str = None,
+                                 cancel_token: Optional[CancellationToken] = None):
+        """
+        Stream sentence chunks from the server as (chunk_path, sample_rate)
+
+        Once cancel_token is cancelled the connection is closed right away,
+        which stops the server after the chunk in progress.
+        """
+        loop = asyncio.get_event_loop()
+        voice_name = voice_name or config.DEFAULT_VOICE
+
+        try:
+            conn, response = await loop.run_in_executor(
+                None,
+                self._open,
+                "POST",
+                "/stream",
+                {"text": text, "voice": voice_name},
+                cancel_token
+            )
+        except GenerationCancelled:
+            logger.info("Stream cancelled")
+            return
+        chunks: asyncio.Queue = asyncio.Queue()
+        stop = threading.Event()
+
+        def abort():
+            stop.set()
+            self._abort(conn)
+
+        reader = loop.run_in_executor(None, self._read_stream, conn, response, loop, chunks, stop)
+        if cancel_token is not None:
+            cancel_token.add_callback(abort)
+        try:
+            while True:
+                if cancel_token is not None and cancel_token.cancelled:
+                    logger.info("Stream cancelled")
+                    return
+                item = await chunks.get()
+                if cancel_token is not None and cancel_token.cancelled:
+                    if isinstance(item, tuple):
+                        item[0].unlink(missing_ok=True)
+                    logger.info("Stream cancelled")
+                    return
+                if item is None:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+
+                yield item
+        finally:
+            if cancel_token is not None:
+                cancel_token.remove_callback(abort)
+            if not reader.done():
+                # Closing the connection early tells the server to stop generating
+                abort()
+            await reader
+            # Discard chunks that were buffered but never consumed
+            while not chunks.empty():
+                item = chunks.get_nowait()
+                if isinstance(item, tuple):
+                    item[0].unlink(missing_ok=True)
+
+    def clear_cache(self, voice_name: str = None):
+        """Clear cached voice prompts on the server"""
+        status, data = self._request("POST", "/clear_cache", {"voice": voice_name})
+        self._raise_for_status(status, data)
+
+    def unload_model(self):
+        """Close pooled connections (the server keeps its model loaded)"""
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
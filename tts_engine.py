@@ -1,12 +1,15 @@
-import torch
 import os
+import time
+import uuid
+import numpy as np
 import soundfile as sf
 from pathlib import Path
 from typing import Optional, Tuple, Dict, Any
 import logging
 
-from qwen_tts import Qwen3TTSModel
 import config
+from cancellation import CancellationToken, GenerationCancelled
+from model_router import ModelRouter, RouteDecision, size_value
 
 logger = logging.getLogger(__name__)
 
@@ -15,19 +18,35 @@ class TTSEngine:
     """Qwen3-TTS Voice Clone Engine with optimizations"""
     
     def __init__(self):
-        self.model: Optional[Qwen3TTSModel] = None
+        self.model: Optional[Any] = None  # Primary model (config.MODEL_SIZE)
+        self.models: Dict[str, Any] = {}  # All loaded models by size
         self.device = config.DEVICE
-        self.model_name = config.MODEL_NAME
-        self.voice_prompts: Dict[str, Any] = {}  # Cache for voice prompts
+        self.model_sizes = config.MODEL_SIZES
+        self.model_name = ", ".join(config.MODEL_NAME_TEMPLATE.format(size=size) for size in self.model_sizes)
+        self.router = ModelRouter(self.model_sizes)
+        self.voice_prompts: Dict[Tuple[str, str], Any] = {}  # Cache for voice prompts by (model size, voice)
         self._compiled = False
         
     def load_model(self):
-        """Load Qwen3-TTS model with optimizations"""
+        """Load Qwen3-TTS models (all of config.MODEL_SIZES) with optimizations"""
         if self.model is not None:
             logger.info("Model already loaded")
             return
-            
-        logger.info(f"Loading Qwen3-TTS model: {self.model_name} on {self.device}")
+        
+        if config.USE_STUB_MODEL:
+            from stub_model import StubTTSModel
+            largest = size_value(self.router.quality)
+            for size in self.model_sizes:
+                # Smaller stub models generate proportionally faster
+                self.models[size] = StubTTSModel(
+                    realtime_factor=config.STUB_REALTIME_FACTOR * size_value(size) / largest
+                )
+            self.model = self.models.get(config.MODEL_SIZE, self.models[self.router.quality])
+            self.model_name = "stub"
+            return
+        
+        # Real model stack is only needed here, so the stub runs without torch/qwen_tts
+        import torch
         
         try:
             # Try FlashAttention2 first, fallback to eager
@@ -43,22 +62,9 @@ class TTSEngine:
             except ImportError:
                 logger.info("FlashAttention2 not available, using eager mode")
             
-            self.model = Qwen3TTSModel.from_pretrained(
-                self.model_name,
-                device_map=self.device,
-                dtype=torch.bfloat16,
-                attn_implementation=attn_impl,
-            )
-            
-            # Enable PyTorch optimizations
-            if hasattr(torch, 'compile'):
-                logger.info("Compiling model with torch.compile()...")
-                try:
-                    self.model = torch.compile(self.model, mode="reduce-overhead")
-                    self._compiled = True
-                    logger.info("Model compiled successfully!")
-                except Exception as e:
-                    logger.warning(f"torch.compile() failed: {e}")
+            for size in self.model_sizes:
+                self.models[size] = self._load_one(size, attn_impl)
+            self.model = self.models.get(config.MODEL_SIZE, self.models[self.router.quality])
             
             # Enable CUDA optimizations
             if torch.cuda.is_available():
@@ -70,8 +76,37 @@ class TTSEngine:
             logger.info("Model loaded successfully")
         except Exception as e:
             logger.error(f"Failed to load model: {e}")
+            self.models.clear()
+            self.model = None
             raise
     
+    def _load_one(self, model_size: str, attn_impl: str) -> Any:
+        """Load and compile a single model size"""
+        import torch
+        from qwen_tts import Qwen3TTSModel
+        
+        model_name = config.MODEL_NAME_TEMPLATE.format(size=model_size)
+        logger.info(f"Loading Qwen3-TTS model: {model_name} on {self.device}")
+        
+        model = Qwen3TTSModel.from_pretrained(
+            model_name,
+            device_map=self.device,
+            dtype=torch.bfloat16,
+            attn_implementation=attn_impl,
+        )
+        
+        # Enable PyTorch optimizations
+        if hasattr(torch, 'compile'):
+            logger.info("Compiling model with torch.compile()...")
+            try:
+                model = torch.compile(model, mode="reduce-overhead")
+                self._compiled = True
+                logger.info("Model compiled successfully!")
+            except Exception as e:
+                logger.warning(f"torch.compile() failed: {e}")
+                
+        return model
+    
     def _get_voice_files(self, voice_name: str) -> Tuple[Path, Path]:
         """Get reference audio and text files for a voice profile"""
         voice_dir = config.VOICES_DIR / voice_name
@@ -85,26 +120,43 @@ class TTSEngine:
             
         return ref_audio, ref_text
     
-    def _get_or_create_prompt(self, voice_name: str) -> Any:
-        """Get cached voice prompt or create new one"""
-        if voice_name in self.voice_prompts:
-            logger.info(f"Using cached prompt for voice '{voice_name}'")
-            return self.voice_prompts[voice_name]
+    def _get_or_create_prompt(self, voice_name: str, model_size: str) -> Any:
+        """Get cached voice prompt or create new one (prompts are per model)"""
+        key = (model_size, voice_name)
+        if key in self.voice_prompts:
+            logger.info(f"Using cached prompt for voice '{voice_name}' ({model_size})")
+            return self.voice_prompts[key]
         
-        logger.info(f"Creating new voice prompt for '{voice_name}'")
+        logger.info(f"Creating new voice prompt for '{voice_name}' ({model_size})")
         ref_audio_path, ref_text_path = self._get_voice_files(voice_name)
         ref_text = ref_text_path.read_text(encoding="utf-8").strip()
         
-        prompt = self.model.create_voice_clone_prompt(
+        prompt = self.models[model_size].create_voice_clone_prompt(
             ref_audio=str(ref_audio_path),
             ref_text=ref_text,
             x_vector_only_mode=False,
         )
         
-        self.voice_prompts[voice_name] = prompt
+        self.voice_prompts[key] = prompt
         return prompt
     
-    def generate(self, text: str, voice_name: str = None, output_path: Path = None) -> Path:
+    def reserve(self, text: str) -> RouteDecision:
+        """
+        Route a generate() job when it is queued, not when it starts
+        
+        Jobs waiting for the executor then count towards the router's backlog.
+        Pass the result to generate(), and to release() once done with it.
+        """
+        return self.router.route(text, "tts")
+    
+    def release(self, route: Optional[RouteDecision]):
+        """Release a reserve()d route (no-op if generate() already finished it)"""
+        if route is not None:
+            self.router.finish(route)
+    
+    def generate(self, text: str, voice_name: str = None, output_path: Path = None,
+                 cancel_token: Optional[CancellationToken] = None,
+                 route: Optional[RouteDecision] = None) -> Path:
         """
         Generate speech using voice cloning with caching
         
@@ -112,54 +164,89 @@ class TTSEngine:
             text: Text to synthesize
             voice_name: Voice profile name (default: config.DEFAULT_VOICE)
             output_path: Output file path (default: temp/output_{timestamp}.wav)
+            cancel_token: Stop generation (checked between sentences) if cancelled
+            route: Model chosen by reserve() when the job was queued
+                   (default: route now)
             
         Returns:
             Path to generated audio file
+            
+        Raises:
+            GenerationCancelled: If cancel_token was cancelled before generation finished
         """
-        if self.model is None:
-            raise RuntimeError("Model not loaded. Call load_model() first.")
-        
         voice_name = voice_name or config.DEFAULT_VOICE
         
         # Generate output path
         if output_path is None:
-            import time
             timestamp = int(time.time() * 1000)
-            output_path = config.TEMP_DIR / f"output_{timestamp}.{config.AUDIO_FORMAT}"
+            output_path = config.TEMP_DIR / f"output_{timestamp}_{uuid.uuid4().hex[:8]}.{config.AUDIO_FORMAT}"
         
-        logger.info(f"Generating TTS: '{text[:50]}...' using voice '{voice_name}'")
+        route = route or self.router.route(text, "tts")
+        elapsed = None
         
         try:
+            # Checked inside the try so a route passed in by the caller is always finished
+            if self.model is None:
+                raise RuntimeError("Model not loaded. Call load_model() first.")
+            
+            if cancel_token is not None:
+                cancel_token.raise_if_cancelled()
+            
+            logger.info(f"Generating TTS: '{text[:50]}...' using voice '{voice_name}' ({route.model_size})")
+            
             # Get or create cached voice prompt (2x faster!)
-            voice_prompt = self._get_or_create_prompt(voice_name)
+            voice_prompt = self._get_or_create_prompt(voice_name, route.model_size)
             
-            # Generate voice clone with cached prompt
+            # Generate voice clone with cached prompt, one sentence per model call
+            # so a cancelled request frees the model after the sentence in progress
             # Note: Model already uses bfloat16, no autocast needed
-            wavs, sr = self.model.generate_voice_clone(
-                text=text,
-                language="Korean",
-                voice_clone_prompt=voice_prompt,
-            )
+            model = self.models[route.model_size]
+            sentences = self._split_sentences(text) or [text]
+            pieces = []
+            start = time.perf_counter()
+            for i, sentence in enumerate(sentences):
+                if cancel_token is not None and cancel_token.cancelled:
+                    logger.info(f"Generation cancelled at sentence {i+1}/{len(sentences)}")
+                    raise GenerationCancelled()
+                wavs, sr = model.generate_voice_clone(
+                    text=sentence,
+                    language="Korean",
+                    voice_clone_prompt=voice_prompt,
+                )
+                if pieces:
+                    # Sentences are synthesized separately, so add the pause between them
+                    pieces.append(np.zeros(int(sr * config.SENTENCE_PAUSE), dtype=wavs[0].dtype))
+                pieces.append(wavs[0])
+            elapsed = time.perf_counter() - start
             
             # Save audio
-            sf.write(str(output_path), wavs[0], sr)
+            sf.write(str(output_path), np.concatenate(pieces), sr)
             logger.info(f"Audio saved to {output_path}")
             
             return output_path
             
+        except GenerationCancelled:
+            raise
         except Exception as e:
             logger.error(f"Failed to generate TTS: {e}")
             raise
+        finally:
+            self.router.finish(route, elapsed)
     
 
-    async def generate_streaming(self, text: str, voice_name: str = None):
-        """Generate speech in streaming mode with optimizations"""
+    async def generate_streaming(self, text: str, voice_name: str = None,
+                                 cancel_token: Optional[CancellationToken] = None):
+        """
+        Generate speech in streaming mode with optimizations
+        
+        Each chunk is routed separately (the first one may use a faster model).
+        Stops after the chunk in progress once cancel_token is cancelled.
+        """
         import asyncio
         if self.model is None:
             raise RuntimeError("Model not loaded")
         
         voice_name = voice_name or config.DEFAULT_VOICE
-        voice_prompt = self._get_or_create_prompt(voice_name)
         
         sentences = self._split_sentences(text)
         
@@ -167,22 +254,44 @@ class TTSEngine:
             if not sentence.strip():
                 continue
                 
-            logger.info(f"Chunk {i+1}/{len(sentences)}: {sentence[:30]}...")
+            if cancel_token is not None and cancel_token.cancelled:
+                logger.info(f"Generation cancelled before chunk {i+1}/{len(sentences)}")
+                return
             
-            loop = asyncio.get_event_loop()
+            route = self.router.route(sentence, "first_chunk" if i == 0 else "chunk")
+            model = self.models[route.model_size]
+            timing = {}
+            try:
+                logger.info(f"Chunk {i+1}/{len(sentences)} ({route.model_size}): {sentence[:30]}...")
             
-            # Generate with bfloat16 (no autocast needed)
-            wavs, sr = await loop.run_in_executor(
-                None,
-                lambda s=sentence: self.model.generate_voice_clone(
-                    text=s,
-                    language="Korean",
-                    voice_clone_prompt=voice_prompt,
-                )
-            )
+                loop = asyncio.get_event_loop()
+            
+                def synthesize(s=sentence, model_size=route.model_size):
+                    # The job may have waited in the executor queue; don't start it if cancelled
+                    if cancel_token is not None and cancel_token.cancelled:
+                        return None
+                    # Prompt creation runs the model too, keep it off the event loop
+                    voice_prompt = self._get_or_create_prompt(voice_name, model_size)
+                    # Generate with bfloat16 (no autocast needed)
+                    start = time.perf_counter()
+                    result = model.generate_voice_clone(
+                        text=s,
+                        language="Korean",
+                        voice_clone_prompt=voice_prompt,
+                    )
+                    timing["elapsed"] = time.perf_counter() - start
+                    return result
+                    
+                result = await loop.run_in_executor(None, synthesize)
+            finally:
+                self.router.finish(route, timing.get("elapsed"))
+                
+            if result is None or (cancel_token is not None and cancel_token.cancelled):
+                logger.info(f"Generation cancelled at chunk {i+1}/{len(sentences)}")
+                return
+            wavs, sr = result
             
-            import time
-            chunk_path = config.TEMP_DIR / f"chunk_{i}_{int(time.time()*1000)}.wav"
+            chunk_path = config.TEMP_DIR / f"chunk_{i}_{int(time.time()*1000)}_{uuid.uuid4().hex[:8]}.wav"
             sf.write(str(chunk_path), wavs[0], sr)
             
             yield (chunk_path, sr)
@@ -199,20 +308,27 @@ class TTSEngine:
                 result.append(sentences[i])
         return [s.strip() for s in result if s.strip()]
 
+    def metrics(self) -> Dict[str, Any]:
+        """Model routing metrics"""
+        return self.router.metrics()
+    
     def clear_cache(self, voice_name: str = None):
-        """Clear cached voice prompts"""
+        """Clear cached voice prompts (for every model)"""
         if voice_name:
-            self.voice_prompts.pop(voice_name, None)
+            for key in [k for k in self.voice_prompts if k[1] == voice_name]:
+                del self.voice_prompts[key]
             logger.info(f"Cleared cache for voice '{voice_name}'")
         else:
             self.voice_prompts.clear()
             logger.info("Cleared all voice prompts cache")
     
     def unload_model(self):
-        """Unload model to free GPU memory"""
+        """Unload models to free GPU memory"""
         if self.model is not None:
-            del self.model
             self.model = None
+            self.models.clear()
             self.voice_prompts.clear()
-            torch.cuda.empty_cache()
+            if not config.USE_STUB_MODEL:
+                import torch
+                torch.cuda.empty_cache()
             logger.info("Model unloaded")
@@ -0,0 +1,47 @@
+"""
+Wire format shared by tts_server.py and tts_client.py
+
+A /stream response body is a sequence of frames:
+
+    kind (1 byte) | sample_rate (uint32 BE) | length (uint32 BE) | payload
+
+    FRAME_AUDIO - payload is one WAV-encoded sentence chunk
+    FRAME_ERROR - payload is a UTF-8 error message, generation stopped
+    FRAME_END   - empty payload, stream finished
+"""
+import struct
+from typing import BinaryIO, Tuple
+
+FRAME_HEADER = struct.Struct(">cII")
+
+FRAME_AUDIO = b"A"
+FRAME_ERROR = b"E"
+FRAME_END = b"D"
+
+
+def pack_frame(kind: bytes, payload: bytes = b"", sample_rate: int = 0) -> bytes:
+    """Encode a single stream frame"""
+    return FRAME_HEADER.pack(kind, sample_rate, len(payload)) + payload
+
+
+def _read_exact(stream: BinaryIO, size: int) -> bytes:
+    """Read exactly size bytes or raise if the stream ends early"""
+    data = b""
+    while len(data) < size:
+        chunk = stream.read(size - len(data))
+        if not chunk:
+            raise ConnectionError("TTS stream closed unexpectedly")
+        data += chunk
+    return data
+
+
+def read_frame(stream: BinaryIO) -> Tuple[bytes, int, bytes]:
+    """
+    Read one frame from a blocking file-like stream
+
+    Returns:
+        (kind, sample_rate, payload)
+    """
+    kind, sample_rate, length = FRAME_HEADER.unpack(_read_exact(stream, FRAME_HEADER.size))
+    payload = _read_exact(stream, length) if length else b""
+    return kind, sample_rate, payload
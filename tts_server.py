@@ -0,0 +1,194 @@
+import asyncio
+import json
+import logging
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Tuple
+
+import soundfile as sf
+from aiohttp import web
+
+import config
+from cancellation import CancellationToken, GenerationCancelled
+from tts_engine import TTSEngine
+from tts_protocol import FRAME_AUDIO, FRAME_END, FRAME_ERROR, pack_frame
+
+logger = logging.getLogger(__name__)
+
+
+class TTSServer:
+    """Local HTTP inference server sharing one TTSEngine between bot processes"""
+
+    def __init__(self, engine: TTSEngine = None, max_workers: int = config.TTS_SERVER_WORKERS):
+        self.engine = engine or TTSEngine()
+        # Every model call (generate and generate_streaming chunks) runs here,
+        # so concurrent requests are multiplexed onto the GPU chunk by chunk
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="tts")
+        self.active_requests = 0
+        self.total_requests = 0
+
+        self.app = web.Application()
+        self.app.add_routes([
+            web.get("/health", self.handle_health),
+            web.get("/metrics", self.handle_metrics),
+            web.post("/generate", self.handle_generate),
+            web.post("/stream", self.handle_stream),
+            web.post("/clear_cache", self.handle_clear_cache),
+        ])
+        self.app.on_startup.append(self._on_startup)
+        self.app.on_cleanup.append(self._on_cleanup)
+
+    async def _on_startup(self, app: web.Application):
+        """Load the model before the server starts accepting connections"""
+        loop = asyncio.get_running_loop()
+        loop.set_default_executor(self.executor)
+        await loop.run_in_executor(None, self.engine.load_model)
+        logger.info("TTS server ready")
+
+    async def _on_cleanup(self, app: web.Application):
+        """Free the model on shutdown"""
+        self.engine.unload_model()
+        self.executor.shutdown(wait=False)
+
+    async def _read_request(self, request: web.Request) -> Tuple[str, str]:
+        """Parse {"text": ..., "voice": ...} from the request body"""
+        try:
+            data = await request.json()
+        except json.JSONDecodeError:
+            raise web.HTTPBadRequest(text="Invalid JSON body")
+
+        text = (data.get("text") or "").strip()
+        if not text:
+            raise web.HTTPBadRequest(text="'text' is required")
+
+        return text, data.get("voice") or config.DEFAULT_VOICE
+
+    async def _watch_disconnect(self, request: web.Request, cancel_token: CancellationToken):
+        """Cancel the request's generation as soon as the client connection is lost"""
+        while not cancel_token.cancelled:
+            transport = request.transport
+            if transport is None or transport.is_closing():
+                logger.info("Client disconnected, cancelling generation")
+                cancel_token.cancel()
+                return
+            await asyncio.sleep(0.1)
+
+    async def handle_health(self, request: web.Request) -> web.Response:
+        """Report server status"""
+        return web.json_response({
+            "status": "ok",
+            "model": self.engine.model_name,
+            "model_sizes": self.engine.model_sizes,
+            "active_requests": self.active_requests,
+            "total_requests": self.total_requests,
+        })
+
+    async def handle_generate(self, request: web.Request) -> web.Response:
+        """Generate a whole utterance and return it as a WAV body"""
+        text, voice = await self._read_request(request)
+        output_path = config.TEMP_DIR / f"server_{uuid.uuid4().hex}.{config.AUDIO_FORMAT}"
+
+        self.active_requests += 1
+        self.total_requests += 1
+        cancel_token = CancellationToken()
+        watcher = asyncio.ensure_future(self._watch_disconnect(request, cancel_token))
+        # Route before queueing so waiting jobs count towards the router's backlog
+        route = self.engine.reserve(text)
+        try:
+            await asyncio.get_running_loop().run_in_executor(
+                None,
+                self.engine.generate,
+                text,
+                voice,
+                output_path,
+                cancel_token,
+                route
+            )
+            body = output_path.read_bytes()
+            sample_rate = sf.info(str(output_path)).samplerate
+        except GenerationCancelled:
+            # Nobody is left to read the response
+            return web.Response(status=499, text="Client disconnected")
+        except FileNotFoundError as e:
+            raise web.HTTPNotFound(text=str(e))
+        except Exception as e:
+            logger.error(f"Generate request failed: {e}")
+            raise web.HTTPInternalServerError(text=str(e))
+        finally:
+            watcher.cancel()
+            # Releases the route if the job never ran
+            self.engine.release(route)
+            self.active_requests -= 1
+            output_path.unlink(missing_ok=True)
+
+        return web.Response(
+            body=body,
+            content_type="audio/wav",
+            headers={"X-Sample-Rate": str(sample_rate)}
+        )
+
+    async def handle_stream(self, request: web.Request) -> web.StreamResponse:
+        """Stream sentence chunks as frames (see tts_protocol.py)"""
+        text, voice = await self._read_request(request)
+
+        response = web.StreamResponse(headers={"Content-Type": "application/octet-stream"})
+        await response.prepare(request)
+
+        self.active_requests += 1
+        self.total_requests += 1
+        cancel_token = CancellationToken()
+        watcher = asyncio.ensure_future(self._watch_disconnect(request, cancel_token))
+        chunks = self.engine.generate_streaming(text, voice, cancel_token)
+        try:
+            async for chunk_path, sr in chunks:
+                try:
+                    data = chunk_path.read_bytes()
+                finally:
+                    chunk_path.unlink(missing_ok=True)
+                await response.write(pack_frame(FRAME_AUDIO, data, sr))
+            if cancel_token.cancelled:
+                return response
+            await response.write(pack_frame(FRAME_END))
+        except ConnectionResetError:
+            # Client went away; cancelling stops the chunk waiting for the model
+            cancel_token.cancel()
+            logger.info("Stream client disconnected")
+            return response
+        except Exception as e:
+            logger.error(f"Stream request failed: {e}")
+            await response.write(pack_frame(FRAME_ERROR, str(e).encode("utf-8")))
+            await response.write(pack_frame(FRAME_END))
+        finally:
+            watcher.cancel()
+            self.active_requests -= 1
+            await chunks.aclose()
+
+        await response.write_eof()
+        return response
+
+    async def handle_metrics(self, request: web.Request) -> web.Response:
+        """Report model routing decisions and load"""
+        return web.json_response(self.engine.metrics())
+
+    async def handle_clear_cache(self, request: web.Request) -> web.Response:
+        """Clear cached voice prompts ({"voice": ...} optional)"""
+        try:
+            data = await request.json()
+        except json.JSONDecodeError:
+            data = {}
+        self.engine.clear_cache(data.get("voice"))
+        return web.json_response({"status": "ok"})
+
+
+def main():
+    """Run the standalone inference server"""
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    server = TTSServer()
+    web.run_app(server.app, host=config.TTS_SERVER_HOST, port=config.TTS_SERVER_PORT)
+
+
+if __name__ == "__main__":
+    main()
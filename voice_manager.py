@@ -3,7 +3,9 @@ from discord.ext import commands
 from pathlib import Path
 import asyncio
 import logging
-from typing import Optional
+from typing import List, Optional
+
+from cancellation import CancellationToken
 
 logger = logging.getLogger(__name__)
 
@@ -11,12 +13,14 @@ logger = logging.getLogger(__name__)
 class VoiceManager:
     """Discord Voice Channel Manager with optimizations"""
     
-    def __init__(self, bot: commands.Bot):
+    def __init__(self, bot: commands.Bot, interrupt: bool = False):
         self.bot = bot
         self.voice_client: Optional[discord.VoiceClient] = None
         self.queue = asyncio.Queue()
         self.is_playing = False
-        self._playback_done = asyncio.Event()
+        self.interrupt = interrupt  # Newest request cancels everything before it
+        self._active_tokens: List[CancellationToken] = []
+        self._playing_token: Optional[CancellationToken] = None
         
     async def join_channel(self, channel: discord.VoiceChannel) -> bool:
         """Join a voice channel"""
@@ -42,6 +46,7 @@ class VoiceManager:
         """Leave current voice channel"""
         try:
             if self.voice_client and self.voice_client.is_connected():
+                self.cancel_all()
                 await self.voice_client.disconnect()
                 self.voice_client = None
                 logger.info("Left voice channel")
@@ -54,7 +59,8 @@ class VoiceManager:
             logger.error(f"Failed to leave channel: {e}")
             return False
     
-    async def play_audio(self, audio_path: Path, cleanup: bool = True, volume: float = 1.0) -> bool:
+    async def play_audio(self, audio_path: Path, cleanup: bool = True, volume: float = 1.0,
+                         cancel_token: Optional[CancellationToken] = None) -> bool:
         """
         Play audio file in voice channel with optimizations
         
@@ -62,6 +68,7 @@ class VoiceManager:
             audio_path: Path to audio file
             cleanup: Delete file after playing
             volume: Playback volume (0.0 to 2.0)
+            cancel_token: Request this clip belongs to (skipped if cancelled)
             
         Returns:
             True if played successfully
@@ -79,8 +86,15 @@ class VoiceManager:
             while self.is_playing:
                 await asyncio.sleep(0.1)
             
+            if cancel_token is not None and cancel_token.cancelled:
+                logger.info(f"Skipped cancelled audio: {audio_path}")
+                if cleanup:
+                    audio_path.unlink(missing_ok=True)
+                return False
+            
             self.is_playing = True
-            self._playback_done.clear()
+            self._playing_token = cancel_token
+            playback_done = asyncio.Event()
             
             # Create audio source with volume transform
             # Note: No before_options needed for local files
@@ -94,10 +108,11 @@ class VoiceManager:
                 
                 logger.info(f"Playback finished: {audio_path}")
                 self.is_playing = False
+                self._playing_token = None
                 
                 # Signal completion
                 asyncio.run_coroutine_threadsafe(
-                    self._cleanup_and_signal(audio_path, cleanup),
+                    self._cleanup_and_signal(audio_path, cleanup, playback_done),
                     self.bot.loop
                 )
             
@@ -106,13 +121,14 @@ class VoiceManager:
             logger.info(f"Playing audio: {audio_path} (volume: {volume})")
             
             # Wait for playback to complete
-            await self._playback_done.wait()
+            await playback_done.wait()
             
             return True
             
         except Exception as e:
             logger.error(f"Failed to play audio: {e}")
             self.is_playing = False
+            self._playing_token = None
             
             # Cleanup on error
             if cleanup and audio_path.exists():
@@ -123,7 +139,7 @@ class VoiceManager:
             
             return False
     
-    async def _cleanup_and_signal(self, audio_path: Path, cleanup: bool):
+    async def _cleanup_and_signal(self, audio_path: Path, cleanup: bool, playback_done: asyncio.Event):
         """Cleanup temp file and signal completion"""
         # Small delay to ensure FFmpeg is completely done
         await asyncio.sleep(0.5)
@@ -136,7 +152,7 @@ class VoiceManager:
                 logger.error(f"Failed to delete temp file: {e}")
         
         # Signal that playback is complete
-        self._playback_done.set()
+        playback_done.set()
     
     def is_connected(self) -> bool:
         """Check if bot is connected to voice channel"""
@@ -153,3 +169,40 @@ class VoiceManager:
         if self.voice_client and self.voice_client.is_playing():
             self.voice_client.stop()
             logger.info("Stopped playback")
+    
+    def begin_speech(self) -> CancellationToken:
+        """Register a new TTS request (in interrupt mode, cancel everything before it)"""
+        if self.interrupt:
+            self.cancel_all()
+        token = CancellationToken()
+        self._active_tokens.append(token)
+        return token
+    
+    def end_speech(self, token: CancellationToken):
+        """Unregister a finished TTS request"""
+        if token in self._active_tokens:
+            self._active_tokens.remove(token)
+    
+    def skip(self) -> bool:
+        """Cancel the request currently playing (or the oldest pending one)"""
+        token = self._playing_token
+        if token is None:
+            token = next((t for t in self._active_tokens if not t.cancelled), None)
+        if token is None:
+            return False
+        
+        token.cancel()
+        if token is self._playing_token:
+            self.stop()
+        logger.info("Skipped current TTS request")
+        return True
+    
+    def cancel_all(self) -> int:
+        """Cancel all pending and playing requests, returns how many were cancelled"""
+        pending = [t for t in self._active_tokens if not t.cancelled]
+        for token in pending:
+            token.cancel()
+        self.stop()
+        if pending:
+            logger.info(f"Cancelled {len(pending)} TTS request(s)")
+        return len(pending)